@@ -1,125 +1,273 @@
 """API client for the external markdown to DOCX conversion service."""
 
+import asyncio
 import os
+import time
+from contextlib import suppress
+from typing import Optional
+
 import httpx
 from .models import ConvertTextRequest, ConvertTextResponse, TemplatesResponse
+from .scheduler import FairScheduler, Priority
+
+DEFAULT_BASE_URL = "https://api.deepshare.app"
+
+# Seconds a fetched template catalog is reused before asking the API again
+TEMPLATES_CACHE_TTL = 300.0
+
+# Seconds an idle pooled connection is kept open. httpx closes idle
+# connections after 5 seconds by default, which would drop the connection
+# opened by the startup warm-up before the first tool call arrives
+KEEPALIVE_EXPIRY = 300.0
+
+# Seconds a conversion waits for a running warm-up before opening its own
+# connection
+WARM_UP_WAIT = 5.0
+
+# Seconds to pause an API key after HTTP 429 without a usable Retry-After header
+DEFAULT_RETRY_AFTER = 30.0
 
 
 class ConversionAPIClient:
     """Client for the external markdown to DOCX conversion API."""
     
-    def __init__(self, base_url: str = "https://api.deepshare.app"):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        scheduler: Optional[FairScheduler] = None
+    ):
         """Initialize the API client.
         
         Args:
-            base_url: Base URL for the conversion API
+            base_url: Base URL for the conversion API, defaults to the
+                DEEP_SHARE_API_URL environment variable or the public service
+            scheduler: Scheduler sharing the API keys between clients,
+                created from environment variables if not given
         """
+        base_url = base_url or os.getenv("DEEP_SHARE_API_URL", DEFAULT_BASE_URL)
         self.base_url = base_url.rstrip('/')
-        self.api_key = os.getenv("DEEP_SHARE_API_KEY")
-        
-        if not self.api_key:
-            raise ValueError("DEEP_SHARE_API_KEY environment variable is required")
+        self.scheduler = scheduler or FairScheduler.from_env()
+        self.api_key = next(iter(self.scheduler.buckets))
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._templates: Optional[TemplatesResponse] = None
+        self._templates_fetched_at = 0.0
+        self._templates_fetch: Optional["asyncio.Future[TemplatesResponse]"] = None
+        self._warm_up_fetch: Optional["asyncio.Future[TemplatesResponse]"] = None
     
-    async def convert_text(self, request: ConvertTextRequest) -> ConvertTextResponse:
+    async def convert_text(
+        self,
+        request: ConvertTextRequest,
+        client_id: str = "default",
+        priority: Priority = Priority.NORMAL
+    ) -> ConvertTextResponse:
         """Convert markdown text to DOCX.
         
+        The request waits in the scheduler's fair queue until one of the
+        configured API keys has budget left.
+        
         Args:
             request: Conversion request parameters
+            client_id: Identifier of the calling client, used for fair sharing
+            priority: Priority class of the request
             
         Returns:
             Response with conversion result
         """
-        async with httpx.AsyncClient() as client:
-            headers = {
-                "X-API-Key": self.api_key,
-                "Content-Type": "application/json"
-            }
+        await self._wait_for_warm_up()
+        api_key = await self.scheduler.acquire(client_id, priority)
+        
+        client = self._get_http_client()
+        
+        headers = {
+            "X-API-Key": api_key,
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "content": request.content,
+            "filename": request.filename,
+            "template_name": request.template_name,
+            "language": request.language,
+            "convert_mermaid": request.convert_mermaid,
+            "remove_hr": request.remove_hr,
+            "compat_mode": request.compat_mode
+        }
+        
+        try:
+            # Decide which endpoint to use
+            is_remote = os.getenv("MCP_SAVE_REMOTE", "false").lower() == "true"
+            endpoint = "/convert-text-to-url" if is_remote else "/convert-text"
             
-            payload = {
-                "content": request.content,
-                "filename": request.filename,
-                "template_name": request.template_name,
-                "language": request.language,
-                "convert_mermaid": request.convert_mermaid,
-                "remove_hr": request.remove_hr,
-                "compat_mode": request.compat_mode
-            }
+            response = await client.post(
+                f"{self.base_url}{endpoint}",
+                headers=headers,
+                json=payload,
+                timeout=60.0
+            )
             
-            try:
-                # Decide which endpoint to use
-                is_remote = os.getenv("MCP_SAVE_REMOTE", "false").lower() == "true"
-                endpoint = "/convert-text-to-url" if is_remote else "/convert-text"
+            if response.status_code == 200:
+                data = response.json() if is_remote else response.content
                 
-                response = await client.post(
-                    f"{self.base_url}{endpoint}",
-                    headers=headers,
-                    json=payload,
-                    timeout=60.0
-                )
-                
-                if response.status_code == 200:
-                    data = response.json() if is_remote else response.content
-                    
-                    if is_remote:
-                        # Backend returned a JSON with {"url": "..."}
-                        return ConvertTextResponse(
-                            success=True,
-                            file_path=data.get("url")
-                        )
-                    else:
-                        # Backend returned binary DOCX
-                        downloads_dir = self._get_downloads_directory()
-                        filename = f"{request.filename}.docx"
-                        file_path = os.path.join(downloads_dir, filename)
-                        file_path = self._ensure_unique_filename(file_path)
-                        
-                        with open(file_path, "wb") as f:
-                            f.write(data)
-                        
-                        return ConvertTextResponse(
-                            success=True,
-                            file_path=file_path
-                        )
-                else:
+                if is_remote:
+                    # Backend returned a JSON with {"url": "..."}
                     return ConvertTextResponse(
-                        success=False,
-                        error_message=f"API request failed with status {response.status_code}: {response.text}"
+                        success=True,
+                        file_path=data.get("url")
                     )
+                else:
+                    # Backend returned binary DOCX
+                    downloads_dir = self._get_downloads_directory()
+                    filename = f"{request.filename}.docx"
+                    file_path = os.path.join(downloads_dir, filename)
+                    file_path = self._ensure_unique_filename(file_path)
                     
-            except httpx.RequestError as e:
-                return ConvertTextResponse(
-                    success=False,
-                    error_message=f"Network error: {str(e)}"
-                )
-            except Exception as e:
+                    with open(file_path, "wb") as f:
+                        f.write(data)
+                    
+                    return ConvertTextResponse(
+                        success=True,
+                        file_path=file_path
+                    )
+            else:
+                if response.status_code == 429:
+                    # Stop handing out this key until the backend allows it again
+                    self.scheduler.penalize(api_key, self._get_retry_after(response))
                 return ConvertTextResponse(
                     success=False,
-                    error_message=f"Unexpected error: {str(e)}"
+                    error_message=f"API request failed with status {response.status_code}: {response.text}"
                 )
-    
-    async def get_templates(self) -> TemplatesResponse:
+                
+        except httpx.RequestError as e:
+            return ConvertTextResponse(
+                success=False,
+                error_message=f"Network error: {str(e)}"
+            )
+        except Exception as e:
+            return ConvertTextResponse(
+                success=False,
+                error_message=f"Unexpected error: {str(e)}"
+            )
+
+    async def get_templates(self, refresh: bool = False) -> TemplatesResponse:
         """Get available templates from the API.
         
+        Successful responses are cached for TEMPLATES_CACHE_TTL seconds, and
+        callers arriving while a fetch is in flight, e.g. during the startup
+        warm-up, share its result instead of sending another request.
+        
+        Args:
+            refresh: Whether to bypass the cached templates
+        
         Returns:
             Response with available templates organized by language
         """
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(
-                    f"{self.base_url}/templates",
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    templates_data = response.json()
-                    return TemplatesResponse(templates=templates_data)
-                else:
-                    # Return empty templates if API fails
-                    return TemplatesResponse(templates={})
-                    
-            except Exception as e:
-                # Return empty templates on error
+        if (
+            not refresh
+            and self._templates is not None
+            and time.monotonic() - self._templates_fetched_at < TEMPLATES_CACHE_TTL
+        ):
+            return self._templates
+        
+        # Shield so a cancelled caller does not abort a fetch others wait on
+        return await asyncio.shield(self._start_templates_fetch())
+    
+    async def warm_up(self) -> bool:
+        """Prepare the client so the first conversion runs at steady-state speed.
+        
+        Fetching the template catalog resolves the backend host, completes
+        the TLS handshake and leaves the connection in the shared pool for
+        the following conversions. Conversions started in the meantime wait
+        for it, up to WARM_UP_WAIT seconds.
+        
+        Returns:
+            True if the backend answered with templates
+        """
+        self._warm_up_fetch = self._start_templates_fetch()
+        response = await asyncio.shield(self._warm_up_fetch)
+        return bool(response.templates)
+    
+    async def aclose(self) -> None:
+        """Cancel a pending template fetch and close pooled connections to the API."""
+        if self._templates_fetch is not None and not self._templates_fetch.done():
+            self._templates_fetch.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._templates_fetch
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+    
+    def _start_templates_fetch(self) -> "asyncio.Future[TemplatesResponse]":
+        """Get the in-flight template fetch, starting one if none is running.
+        
+        Returns:
+            Future resolving to the fetched templates
+        """
+        if self._templates_fetch is None or self._templates_fetch.done():
+            self._templates_fetch = asyncio.ensure_future(self._fetch_templates())
+        return self._templates_fetch
+    
+    async def _fetch_templates(self) -> TemplatesResponse:
+        """Request the template catalog and cache it on success.
+        
+        Returns:
+            Response with available templates organized by language
+        """
+        client = self._get_http_client()
+        
+        try:
+            response = await client.get(
+                f"{self.base_url}/templates",
+                timeout=30.0
+            )
+            
+            if response.status_code == 200:
+                templates_data = response.json()
+                self._templates = TemplatesResponse(templates=templates_data)
+                self._templates_fetched_at = time.monotonic()
+                return self._templates
+            else:
+                # Return empty templates if API fails
                 return TemplatesResponse(templates={})
+                
+        except Exception as e:
+            # Return empty templates on error
+            return TemplatesResponse(templates={})
+    
+    async def _wait_for_warm_up(self) -> None:
+        """Wait briefly for a running warm-up so its connection is reused."""
+        fetch = self._warm_up_fetch
+        if fetch is not None and not fetch.done():
+            await asyncio.wait({fetch}, timeout=WARM_UP_WAIT)
+    
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use.
+        
+        Returns:
+            HTTP client keeping connections to the API alive between requests
+        """
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=100,
+                    max_keepalive_connections=20,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                )
+            )
+        return self._http_client
+    
+    def _get_retry_after(self, response: httpx.Response) -> float:
+        """Get the backoff delay requested by a throttled response.
+        
+        Args:
+            response: Response with status 429
+            
+        Returns:
+            Delay in seconds
+        """
+        try:
+            return max(0.0, float(response.headers.get("Retry-After")))
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
     
     def _get_downloads_directory(self) -> str:
         """Get the user's Downloads directory.
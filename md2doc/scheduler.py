@@ -0,0 +1,335 @@
+"""Rate limiting and fair-share scheduling for backend API keys."""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from enum import IntEnum
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+class Priority(IntEnum):
+    """Priority classes for queued conversion requests.
+
+    Lower values are served first.
+    """
+
+    HIGH = 0
+    NORMAL = 1
+    LOW = 2
+
+
+class TokenBucket:
+    """Token bucket limiting the request rate of a single API key."""
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """Initialize the token bucket.
+
+        Args:
+            rate: Tokens added per second, or None for no limit
+            capacity: Maximum number of tokens (burst size), defaults to max(1, rate)
+            clock: Monotonic clock returning seconds
+        """
+        if capacity is not None and capacity < 1:
+            # A bucket that can never hold a whole token would block forever
+            raise ValueError(f"Burst size must be at least 1, got {capacity}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate or 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    @property
+    def tokens(self) -> float:
+        """Number of tokens currently available."""
+        if self.rate is None:
+            return float("inf") if self._clock() >= self._blocked_until else 0.0
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> bool:
+        """Take one token if available.
+
+        Returns:
+            True if a token was taken
+        """
+        if self.time_until_available() > 0:
+            return False
+        if self.rate is not None:
+            self._tokens -= 1
+        return True
+
+    def time_until_available(self) -> float:
+        """Get the number of seconds until a token can be taken."""
+        now = self._clock()
+        blocked = max(0.0, self._blocked_until - now)
+        if self.rate is None:
+            return blocked
+        self._refill()
+        missing = max(0.0, 1 - self._tokens)
+        return max(blocked, missing / self.rate if self.rate > 0 else float("inf"))
+
+    def penalize(self, delay: float) -> None:
+        """Drain the bucket and block it for a while, e.g. after HTTP 429.
+
+        Once the block ends a single request may go through; further tokens
+        only accumulate from then on, so the blocked period is not credited
+        as a burst.
+
+        Args:
+            delay: Seconds during which no tokens are handed out
+        """
+        self._refill()
+        self._tokens = min(self._tokens, 1.0)
+        self._blocked_until = max(self._blocked_until, self._clock() + delay)
+        self._updated = max(self._updated, self._blocked_until)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        if self.rate is not None:
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        # Never move back before the end of a penalty block
+        self._updated = max(self._updated, now)
+
+
+class FairScheduler:
+    """Fair queue handing out API keys to waiting clients.
+
+    Waiters are served by priority class first and round-robin across
+    clients within a class, so one busy client cannot starve the others.
+    Each API key has its own token bucket; the key with the most tokens
+    available is picked for every request.
+    """
+
+    def __init__(
+        self,
+        budgets: Dict[str, Optional[float]],
+        burst: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        client_priorities: Optional[Dict[str, Priority]] = None,
+        default_priority: Priority = Priority.NORMAL,
+    ):
+        """Initialize the scheduler.
+
+        Args:
+            budgets: Mapping of API key to its rate in requests per second
+                (None for no limit)
+            burst: Bucket capacity shared by all keys, defaults to max(1, rate)
+            clock: Monotonic clock returning seconds
+            client_priorities: Priority classes of known client IDs
+            default_priority: Priority class of all other clients
+        """
+        if not budgets:
+            raise ValueError("At least one API key is required")
+        self.buckets: Dict[str, TokenBucket] = {
+            key: TokenBucket(rate, burst, clock) for key, rate in budgets.items()
+        }
+        self._keys: List[str] = list(self.buckets)
+        self._next_key = 0
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[asyncio.Future]]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.client_priorities = client_priorities or {}
+        self.default_priority = default_priority
+
+    @classmethod
+    def from_env(cls) -> "FairScheduler":
+        """Create a scheduler from environment variables.
+
+        ``DEEP_SHARE_API_KEYS`` holds a comma-separated list of keys, each
+        optionally followed by ``:<requests per minute>``. It falls back to
+        ``DEEP_SHARE_API_KEY``. ``MD2DOC_RATE_LIMIT`` sets the default
+        requests per minute for keys without their own budget and
+        ``MD2DOC_RATE_BURST`` the burst size. ``MD2DOC_CLIENT_PRIORITIES``
+        maps client IDs to priority classes (``"editor:high,ci-bot:low"``)
+        and ``MD2DOC_DEFAULT_PRIORITY`` sets the class of everyone else.
+
+        Returns:
+            Configured scheduler
+        """
+        default_rate = _parse_rate(os.getenv("MD2DOC_RATE_LIMIT"), "MD2DOC_RATE_LIMIT")
+        burst = _parse_number(os.getenv("MD2DOC_RATE_BURST"), "MD2DOC_RATE_BURST")
+        if burst is not None and burst < 1:
+            raise ValueError(f"MD2DOC_RATE_BURST must be at least 1, got {burst:g}")
+
+        budgets: Dict[str, Optional[float]] = {}
+        for entry in os.getenv("DEEP_SHARE_API_KEYS", "").split(","):
+            key, _, rate = entry.strip().partition(":")
+            if key:
+                budgets[key] = (
+                    _parse_rate(rate, "DEEP_SHARE_API_KEYS") if rate else default_rate
+                )
+
+        if not budgets:
+            api_key = os.getenv("DEEP_SHARE_API_KEY")
+            if not api_key:
+                raise ValueError("DEEP_SHARE_API_KEY environment variable is required")
+            budgets[api_key] = default_rate
+
+        return cls(
+            budgets,
+            burst=burst,
+            client_priorities=parse_priorities(os.getenv("MD2DOC_CLIENT_PRIORITIES")),
+            default_priority=parse_priority(os.getenv("MD2DOC_DEFAULT_PRIORITY", "normal")),
+        )
+
+    @property
+    def pending(self) -> int:
+        """Number of requests waiting for an API key."""
+        return sum(
+            1
+            for queues in self._queues.values()
+            for queue in queues.values()
+            for waiter in queue
+            if not waiter.done()
+        )
+
+    def priority_for(self, client_id: Optional[str]) -> Priority:
+        """Get the priority class of a client.
+
+        Args:
+            client_id: Client ID, or None for unidentified clients
+
+        Returns:
+            Configured priority of the client, or the default priority
+        """
+        return self.client_priorities.get(client_id, self.default_priority)
+
+    async def acquire(
+        self, client_id: str = "default", priority: Priority = Priority.NORMAL
+    ) -> str:
+        """Wait for a turn and return the API key to use for one request.
+
+        Args:
+            client_id: Identifier of the calling client, used for fair sharing
+            priority: Priority class of the request
+
+        Returns:
+            API key with budget reserved for this request
+        """
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(client_id, deque()).append(waiter)
+        self._dispatch()
+        return await waiter
+
+    def penalize(self, api_key: str, delay: float) -> None:
+        """Pause an API key, e.g. after the backend answered HTTP 429.
+
+        Args:
+            api_key: Key that was throttled
+            delay: Seconds to wait before using the key again
+        """
+        bucket = self.buckets.get(api_key)
+        if bucket is not None:
+            bucket.penalize(delay)
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while True:
+            entry = self._peek_waiter()
+            if entry is None:
+                return
+            key, wait = self._pick_key()
+            if key is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    wait, self._dispatch
+                )
+                return
+            priority, client_id = entry
+            queue = self._queues[priority].pop(client_id)
+            waiter = queue.popleft()
+            if queue:
+                # Move the client to the back of its class for round-robin
+                self._queues[priority][client_id] = queue
+            self.buckets[key].try_acquire()
+            waiter.set_result(key)
+
+    def _peek_waiter(self) -> Optional[Tuple[Priority, str]]:
+        for priority in Priority:
+            queues = self._queues[priority]
+            for client_id in list(queues):
+                queue = queues[client_id]
+                while queue and queue[0].done():
+                    queue.popleft()
+                if queue:
+                    return priority, client_id
+                del queues[client_id]
+        return None
+
+    def _pick_key(self) -> Tuple[Optional[str], float]:
+        best_key = None
+        best_tokens = 0.0
+        wait = float("inf")
+        count = len(self._keys)
+        for offset in range(count):
+            key = self._keys[(self._next_key + offset) % count]
+            bucket = self.buckets[key]
+            key_wait = bucket.time_until_available()
+            if key_wait > 0:
+                wait = min(wait, key_wait)
+            elif best_key is None or bucket.tokens > best_tokens:
+                best_key, best_tokens = key, bucket.tokens
+        if best_key is not None:
+            self._next_key = (self._keys.index(best_key) + 1) % count
+        return best_key, wait
+
+
+def parse_priorities(value: Optional[str]) -> Dict[str, Priority]:
+    """Parse a ``client:priority`` list such as ``"ci-bot:low,editor:high"``.
+
+    Args:
+        value: Comma-separated entries, priorities are high, normal or low
+
+    Returns:
+        Mapping of client ID to priority class
+    """
+    priorities: Dict[str, Priority] = {}
+    for entry in (value or "").split(","):
+        client_id, _, name = entry.strip().rpartition(":")
+        if not entry.strip():
+            continue
+        if not client_id:
+            raise ValueError(f"Invalid priority entry '{entry.strip()}', expected client:priority")
+        priorities[client_id] = parse_priority(name)
+    return priorities
+
+
+def parse_priority(name: str) -> Priority:
+    """Convert a priority name (high, normal or low) to a Priority."""
+    try:
+        return Priority[name.strip().upper()]
+    except KeyError:
+        choices = ", ".join(p.name.lower() for p in Priority)
+        raise ValueError(f"Unknown priority '{name}', expected one of: {choices}") from None
+
+
+def _parse_number(value: Optional[str], name: str) -> Optional[float]:
+    """Convert a numeric setting, naming the setting if it is invalid."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got '{value}'") from None
+
+
+def _parse_rate(value: Optional[str], name: str) -> Optional[float]:
+    """Convert a requests-per-minute setting to requests per second."""
+    rate = _parse_number(value, name)
+    if rate is None:
+        return None
+    if rate <= 0:
+        # Leave the setting unset for no limit; a typo must not remove it
+        raise ValueError(f"{name} must be a positive number, got '{value}'")
+    return rate / 60.0
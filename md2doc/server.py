@@ -1,23 +1,44 @@
 """MCP Server for Markdown to DOCX conversion."""
 
+import asyncio
 import logging
-from typing import Optional
+import os
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator, Optional
 
-from mcp.server.fastmcp import FastMCP
+from mcp.server.auth.middleware.auth_context import get_access_token
+from mcp.server.fastmcp import Context, FastMCP
 
 from .api_client import ConversionAPIClient
 from .models import ConvertTextRequest
+from .scheduler import Priority
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize the FastMCP server
-mcp = FastMCP("md2doc")
-
 # Initialize API client lazily
 _api_client = None
 
+# Background warm-up started with the server
+_warm_up_task: Optional[asyncio.Task] = None
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """Start the warm-up when the server starts, unless MD2DOC_WARMUP=false.
+    
+    HTTP transports enter the lifespan once per session, so cleanup is left
+    to shutdown(), which runs once when the server stops.
+    """
+    if os.getenv("MD2DOC_WARMUP", "true").lower() == "true":
+        start_warm_up()
+    yield
+
+
+# Initialize the FastMCP server
+mcp = FastMCP("md2doc", lifespan=lifespan)
+
 
 def get_api_client() -> ConversionAPIClient:
     """Get or create the API client."""
@@ -27,6 +48,72 @@ def get_api_client() -> ConversionAPIClient:
     return _api_client
 
 
+def start_warm_up() -> Optional[asyncio.Task]:
+    """Create the API client and warm it up in the background.
+    
+    Tool calls do not wait for the warm-up; they share its pooled
+    connection and template cache once it is done.
+    
+    Returns:
+        The warm-up task, or None if the API client cannot be created
+    """
+    global _warm_up_task
+    if _warm_up_task is None:
+        try:
+            api_client = get_api_client()
+        except ValueError as e:
+            logger.warning(f"Skipping warm-up: {e}")
+            return None
+        _warm_up_task = asyncio.create_task(_warm_up(api_client))
+    return _warm_up_task
+
+
+async def _warm_up(api_client: ConversionAPIClient) -> None:
+    """Warm up the API client, logging instead of raising on failure."""
+    try:
+        if await api_client.warm_up():
+            logger.info("Warm-up finished, backend connection is ready")
+        else:
+            logger.warning("Warm-up could not fetch templates from the backend")
+    except Exception as e:
+        logger.warning(f"Warm-up failed: {e}")
+
+
+def get_client_id(ctx: Optional[Context]) -> str:
+    """Identify the MCP client behind a tool call for fair scheduling.
+    
+    Only identities the server controls are used: the authenticated OAuth
+    client, or else the MCP session. The request's ``_meta.client_id`` is
+    set by the caller and is deliberately ignored.
+    """
+    authenticated_id = get_authenticated_client_id()
+    if authenticated_id:
+        return f"client:{authenticated_id}"
+    if ctx is None:
+        return "default"
+    try:
+        return f"session:{id(ctx.session)}"
+    except ValueError:
+        # Context is not attached to a request
+        return "default"
+
+
+def get_authenticated_client_id() -> Optional[str]:
+    """Get the OAuth client ID of the current request, if auth is enabled."""
+    access_token = get_access_token()
+    return access_token.client_id if access_token else None
+
+
+def get_priority(api_client: ConversionAPIClient) -> Priority:
+    """Get the priority class for the current request.
+    
+    Authenticated clients listed in MD2DOC_CLIENT_PRIORITIES get their
+    configured class, everyone else gets MD2DOC_DEFAULT_PRIORITY. Both are
+    parsed once when the API client is created.
+    """
+    return api_client.scheduler.priority_for(get_authenticated_client_id())
+
+
 @mcp.tool()
 async def convert_markdown_to_docx(
     content: str,
@@ -35,7 +122,10 @@ async def convert_markdown_to_docx(
     language: str = "zh",
     convert_mermaid: bool = False,
     remove_hr: bool = False,
-    compat_mode: Optional[bool] = True
+    compat_mode: Optional[bool] = True,
+    # Plain Context annotation: older FastMCP releases only inject the context
+    # for non-generic annotations and would expose Optional[Context] as an argument
+    ctx: Context = None
 ) -> str:
     """Convert markdown text to DOCX format and save to Downloads directory.
     
@@ -68,7 +158,11 @@ async def convert_markdown_to_docx(
         
         # Get API client and convert markdown to DOCX
         api_client = get_api_client()
-        response = await api_client.convert_text(request)
+        response = await api_client.convert_text(
+            request,
+            client_id=get_client_id(ctx),
+            priority=get_priority(api_client)
+        )
         
         if response.success:
             if response.file_path.startswith("http"):
@@ -113,9 +207,40 @@ async def list_templates() -> str:
         return f"Error fetching templates: {str(e)}"
 
 
+async def shutdown() -> None:
+    """Cancel a pending warm-up and close pooled connections to the API."""
+    global _warm_up_task
+    if _warm_up_task is not None:
+        _warm_up_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _warm_up_task
+        _warm_up_task = None
+    if _api_client is not None:
+        await _api_client.aclose()
+
+
+async def serve(transport: str = "stdio") -> None:
+    """Run the MCP server and clean up once it stops.
+    
+    Args:
+        transport: 'stdio', 'sse' or 'streamable-http'
+    """
+    runners = {
+        "stdio": mcp.run_stdio_async,
+        "sse": mcp.run_sse_async,
+        "streamable-http": mcp.run_streamable_http_async,
+    }
+    if transport not in runners:
+        raise ValueError(f"Unknown transport: {transport}")
+    try:
+        await runners[transport]()
+    finally:
+        await shutdown()
+
+
 def main():
     """Main entry point for the MCP server."""
-    mcp.run()
+    asyncio.run(serve())
 
 
 if __name__ == "__main__":
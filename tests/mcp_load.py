@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""Load generator for the md2doc MCP server.
+
+Drives the real server with many concurrent ``tools/call`` requests against a
+local fake conversion backend and reports throughput, latency percentiles,
+server event-loop lag and memory usage over time. Server lag is measured as
+the round trip of MCP pings sent while the tool calls are in flight; the
+server answers them from the same event loop, so they slow down when it is
+busy.
+
+Stdio (default) starts ``python -m md2doc.server`` as a subprocess:
+
+    python tests/mcp_load.py --requests 500 --concurrency 32
+
+HTTP connects to a server that is already running with the streamable HTTP
+transport and pointed at the fake backend (``--backend-only`` starts just the
+backend and prints its URL):
+
+    python tests/mcp_load.py --backend-only --backend-port 8765
+    DEEP_SHARE_API_KEY=load-test DEEP_SHARE_API_URL=http://127.0.0.1:8765 \\
+        MCP_SAVE_REMOTE=true python -c \\
+        "import asyncio; from md2doc.server import serve; asyncio.run(serve('streamable-http'))"
+    python tests/mcp_load.py --http http://127.0.0.1:8000/mcp
+
+Server memory is sampled from the process listening on the URL's port, or
+from ``--server-pid``. Runs ignore the operator's rate limiting and API key
+settings; pass them with ``--server-env NAME=VALUE`` to load test them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SAMPLE_MARKDOWN = "# Load Test\n\nSome **markdown** with a list:\n\n- one\n- two\n"
+
+
+class FakeBackendHandler(BaseHTTPRequestHandler):
+    """Minimal stand-in for the conversion API."""
+
+    # Keep connections open like the real API, so connection pooling and
+    # warm-up regressions show up in the numbers
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        if self.path == "/templates":
+            self._send_json({"en": ["templates"], "zh": ["templates"]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.loads(body or b"{}")
+        time.sleep(self.latency)
+
+        if self.path == "/convert-text-to-url":
+            self._send_json({"url": f"http://fake-backend/{payload.get('filename')}.docx"})
+        elif self.path == "/convert-text":
+            self._send(200, b"PK\x03\x04fake-docx", "application/octet-stream")
+        else:
+            self.send_error(404)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data: Any):
+        self._send(200, json.dumps(data).encode(), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeBackend:
+    """Fake conversion backend running in a background thread."""
+
+    def __init__(self, port: int = 0, latency: float = 0.0):
+        handler = type("Handler", (FakeBackendHandler,), {"latency": latency})
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "FakeBackend":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StdioTransport:
+    """JSON-RPC over the stdio of a server subprocess."""
+
+    def __init__(self, env: Dict[str, str], timeout: float = 60.0):
+        self.env = env
+        self.timeout = timeout
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._next_id = 0
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self._failure: Optional[Exception] = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process else None
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "md2doc.server",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+            env=self.env,
+            cwd=PROJECT_ROOT,
+            limit=16 * 1024 * 1024
+        )
+        self._reader = asyncio.create_task(self._read_responses())
+
+        await self.request("initialize", {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "md2doc-load", "version": "1.0.0"}
+        })
+        await self._send({"jsonrpc": "2.0", "method": "notifications/initialized"})
+
+    async def request(
+        self, method: str, params: Dict[str, Any], timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        if self._failure is not None:
+            raise self._failure
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params})
+            response = await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Timeout waiting for {method} response") from None
+        finally:
+            self._pending.pop(request_id, None)
+        if "error" in response:
+            raise RuntimeError(response["error"].get("message", "JSON-RPC error"))
+        return response.get("result", {})
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        result = await self.request("tools/call", {"name": name, "arguments": arguments})
+        if result.get("isError"):
+            raise RuntimeError(_tool_text(result.get("content", [])))
+        return _tool_text(result.get("content", []))
+
+    async def ping(self):
+        await self.request("ping", {})
+
+    async def close(self):
+        if self.process is None:
+            return
+        self.process.stdin.close()
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=5.0)
+        except asyncio.TimeoutError:
+            self.process.kill()
+            await self.process.wait()
+        if self._reader:
+            self._reader.cancel()
+
+    async def _send(self, message: Dict[str, Any]):
+        self.process.stdin.write((json.dumps(message) + "\n").encode())
+        await self.process.stdin.drain()
+
+    async def _read_responses(self):
+        failure = RuntimeError("Server closed stdout")
+        try:
+            while True:
+                line = await self.process.stdout.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    # Anything but JSON-RPC on stdout breaks the protocol stream
+                    failure = RuntimeError(f"Server wrote non-JSON output: {line[:200]!r}")
+                    break
+                future = self._pending.get(message.get("id"))
+                if future is not None and not future.done():
+                    future.set_result(message)
+        except Exception as e:
+            failure = RuntimeError(f"Error reading server output: {e}")
+        finally:
+            self._failure = failure
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(failure)
+
+
+class HTTPTransport:
+    """Streamable HTTP connection using the MCP client library."""
+
+    def __init__(self, url: str, pid: Optional[int] = None):
+        """Initialize the transport.
+
+        Args:
+            url: Streamable HTTP endpoint of the server
+            pid: Server process ID for RSS sampling, found from the
+                listening port if not given (Linux only)
+        """
+        self.url = url
+        self.pid = pid if pid is not None else find_listening_pid(url)
+        self._stack = None
+        self.session = None
+
+    async def start(self):
+        from contextlib import AsyncExitStack
+
+        from mcp import ClientSession
+        from mcp.client.streamable_http import streamablehttp_client
+
+        self._stack = AsyncExitStack()
+        read, write, _ = await self._stack.enter_async_context(streamablehttp_client(self.url))
+        self.session = await self._stack.enter_async_context(ClientSession(read, write))
+        await self.session.initialize()
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        result = await self.session.call_tool(name, arguments)
+        content = [item.model_dump() for item in result.content]
+        if result.isError:
+            raise RuntimeError(_tool_text(content))
+        return _tool_text(content)
+
+    async def ping(self):
+        await self.session.send_ping()
+
+    async def close(self):
+        if self._stack is not None:
+            await self._stack.aclose()
+
+
+@dataclass
+class LoadReport:
+    """Results of a load test run."""
+
+    latencies: List[float] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    server_lag_pings: List[float] = field(default_factory=list)
+    generator_loop_lags: List[float] = field(default_factory=list)
+    rss_samples: List[float] = field(default_factory=list)
+    samples: List[Dict[str, float]] = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def completed(self) -> int:
+        return len(self.latencies) + len(self.errors)
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.completed / self.duration if self.duration else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "requests": self.completed,
+            "errors": len(self.errors),
+            "duration_s": round(self.duration, 3),
+            "requests_per_s": round(self.requests_per_second, 1),
+            "latency_ms": _percentiles(self.latencies),
+            # Server responsiveness under load, see the module docstring
+            "server_lag_ping_ms": _percentiles(self.server_lag_pings),
+            # Lag of this generator's own event loop; if high, the generator
+            # rather than the server limits the run
+            "generator_loop_lag_ms": _percentiles(self.generator_loop_lags),
+            "rss_mb_max": round(max(self.rss_samples), 1) if self.rss_samples else None,
+        }
+
+
+def _tool_text(content: List[Dict[str, Any]]) -> str:
+    return "\n".join(item.get("text", "") for item in content if item.get("type") == "text")
+
+
+def _percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(fraction: float) -> float:
+        index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 2)
+
+    return {
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": pick(1.0),
+        "mean": round(statistics.fmean(ordered) * 1000, 2),
+    }
+
+
+def find_listening_pid(url: str) -> Optional[int]:
+    """Find the local process listening on the port of a URL (Linux only)."""
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+
+    inodes = set()
+    for table in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(table) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    # State 0A is LISTEN
+                    if int(fields[1].rsplit(":", 1)[1], 16) == port and fields[3] == "0A":
+                        inodes.add(fields[9])
+        except OSError:
+            continue
+    if not inodes:
+        return None
+
+    targets = {f"socket:[{inode}]" for inode in inodes}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            for fd in os.listdir(f"/proc/{entry}/fd"):
+                if os.readlink(f"/proc/{entry}/fd/{fd}") in targets:
+                    return int(entry)
+        except OSError:
+            continue
+    return None
+
+
+def read_rss_mb(pid: Optional[int]) -> Optional[float]:
+    """Read the resident set size of a process in MB (Linux only)."""
+    if pid is None:
+        return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+async def run_load(
+    transport,
+    requests: int = 200,
+    concurrency: int = 16,
+    tool: str = "convert_markdown_to_docx",
+    sample_interval: float = 1.0,
+    verbose: bool = False,
+) -> LoadReport:
+    """Send tool calls through a started transport and collect metrics.
+
+    Args:
+        transport: Started StdioTransport or HTTPTransport
+        requests: Total number of tool calls
+        concurrency: Maximum number of calls in flight
+        tool: Tool to call, 'convert_markdown_to_docx' or 'list_templates'
+        sample_interval: Seconds between time-series samples
+        verbose: Print each sample while running
+
+    Returns:
+        Collected load report
+    """
+    report = LoadReport()
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    async def worker():
+        while True:
+            try:
+                index = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            arguments = {}
+            if tool == "convert_markdown_to_docx":
+                arguments = {"content": SAMPLE_MARKDOWN, "filename": f"load-{index}", "language": "en"}
+            started = time.perf_counter()
+            try:
+                text = await transport.call_tool(tool, arguments)
+                if text.startswith(("❌", "Error")):
+                    raise RuntimeError(text)
+                report.latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                report.errors.append(str(e))
+
+    async def monitor():
+        last_completed = 0
+        last_sampled = time.perf_counter()
+        while True:
+            tick = time.perf_counter()
+            await asyncio.sleep(sample_interval)
+            report.generator_loop_lags.append(max(0.0, time.perf_counter() - tick - sample_interval))
+
+            # Ping is answered by the server's event loop between tool calls,
+            # so its round trip tracks how responsive the server stays under load
+            ping_started = time.perf_counter()
+            try:
+                await asyncio.wait_for(transport.ping(), timeout=10.0)
+                report.server_lag_pings.append(time.perf_counter() - ping_started)
+            except Exception:
+                pass
+
+            rss = read_rss_mb(transport.pid)
+            if rss is not None:
+                report.rss_samples.append(rss)
+
+            now = time.perf_counter()
+            completed = report.completed
+            sample = {
+                "t": round(now - started_at, 2),
+                "completed": completed,
+                "rps": round((completed - last_completed) / (now - last_sampled), 1),
+                "server_lag_ping_ms": (
+                    round(report.server_lag_pings[-1] * 1000, 2) if report.server_lag_pings else None
+                ),
+                "rss_mb": round(rss, 1) if rss is not None else None,
+            }
+            last_completed, last_sampled = completed, now
+            report.samples.append(sample)
+            if verbose:
+                print(json.dumps(sample), flush=True)
+
+    started_at = time.perf_counter()
+    monitor_task = asyncio.create_task(monitor())
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        report.duration = time.perf_counter() - started_at
+        monitor_task.cancel()
+        try:
+            await monitor_task
+        except asyncio.CancelledError:
+            pass
+
+    return report
+
+
+# Server settings that would change the measured behaviour; load runs start
+# without them unless they are passed explicitly with --server-env
+SERVER_SETTINGS = (
+    "DEEP_SHARE_API_KEYS",
+    "MD2DOC_RATE_LIMIT",
+    "MD2DOC_RATE_BURST",
+    "MD2DOC_CLIENT_PRIORITIES",
+    "MD2DOC_DEFAULT_PRIORITY",
+)
+
+
+def server_env(
+    backend_url: str,
+    home: str,
+    remote: bool = True,
+    overrides: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """Build a reproducible environment for a server talking to the fake backend.
+
+    Args:
+        backend_url: URL of the fake backend
+        home: Temporary HOME directory for saved files
+        remote: Whether the server returns download links instead of files
+        overrides: Extra server settings, e.g. to load test the rate limiter
+    """
+    env = os.environ.copy()
+    for name in SERVER_SETTINGS:
+        env.pop(name, None)
+    env["DEEP_SHARE_API_KEY"] = "load-test"
+    env["MD2DOC_WARMUP"] = "true"
+    env["DEEP_SHARE_API_URL"] = backend_url
+    env["MCP_SAVE_REMOTE"] = "true" if remote else "false"
+    env["HOME"] = home
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PROJECT_ROOT, env.get("PYTHONPATH")]))
+    env.update(overrides or {})
+    return env
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    with FakeBackend(args.backend_port, args.backend_latency) as backend:
+        if args.backend_only:
+            print(f"Fake backend listening on {backend.url} (Ctrl+C to stop)")
+            await asyncio.Event().wait()
+
+        with tempfile.TemporaryDirectory() as home:
+            if args.http:
+                transport = HTTPTransport(args.http, pid=args.server_pid)
+                if transport.pid is None:
+                    print("Server process not found, RSS will not be reported", file=sys.stderr)
+            else:
+                overrides = dict(item.split("=", 1) for item in args.server_env)
+                env = server_env(backend.url, home, remote=not args.local, overrides=overrides)
+                transport = StdioTransport(env, timeout=args.timeout)
+
+            await transport.start()
+            try:
+                report = await run_load(
+                    transport,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    tool=args.tool,
+                    sample_interval=args.interval,
+                    verbose=not args.quiet,
+                )
+            finally:
+                await transport.close()
+
+    summary = report.summary()
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"summary": summary, "samples": report.samples, "errors": report.errors[:20]}, f, indent=2)
+    return 1 if report.errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the md2doc MCP server")
+    parser.add_argument("--requests", type=int, default=200, help="total tool calls")
+    parser.add_argument("--concurrency", type=int, default=16, help="calls in flight")
+    parser.add_argument("--tool", default="convert_markdown_to_docx",
+                        choices=["convert_markdown_to_docx", "list_templates"])
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between samples")
+    parser.add_argument("--http", metavar="URL", help="streamable HTTP endpoint of a running server")
+    parser.add_argument("--server-pid", type=int,
+                        help="HTTP server process for RSS sampling (found from the port if omitted)")
+    parser.add_argument("--server-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="extra stdio server setting, e.g. MD2DOC_RATE_LIMIT=600")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds to wait for each response")
+    parser.add_argument("--local", action="store_true", help="save DOCX files to a temporary HOME")
+    parser.add_argument("--backend-port", type=int, default=0, help="port of the fake backend")
+    parser.add_argument("--backend-latency", type=float, default=0.0, help="fake backend delay in seconds")
+    parser.add_argument("--backend-only", action="store_true", help="only run the fake backend")
+    parser.add_argument("--output", help="write summary and samples as JSON")
+    parser.add_argument("--quiet", action="store_true", help="do not print samples while running")
+    args = parser.parse_args()
+    for item in args.server_env:
+        if "=" not in item:
+            parser.error(f"--server-env expects NAME=VALUE, got '{item}'")
+
+    try:
+        sys.exit(asyncio.run(main_async(args)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
 """Tests for the API client."""
 
+import asyncio
 import os
 import pytest
 from unittest.mock import AsyncMock, patch, Mock
-from md2doc.api_client import ConversionAPIClient
+from md2doc.api_client import KEEPALIVE_EXPIRY, ConversionAPIClient
 from md2doc.models import ConvertTextRequest, TemplatesResponse
 
 
@@ -29,6 +30,12 @@ class TestConversionAPIClient:
             client = ConversionAPIClient("https://custom-api.com")
             assert client.base_url == "https://custom-api.com"
     
+    def test_init_with_base_url_from_env(self):
+        """Test initialization with base URL from environment."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key", "DEEP_SHARE_API_URL": "http://127.0.0.1:8765/"}):
+            client = ConversionAPIClient()
+            assert client.base_url == "http://127.0.0.1:8765"
+    
     @pytest.mark.asyncio
     async def test_convert_text_success(self):
         """Test successful text conversion."""
@@ -94,6 +101,36 @@ class TestConversionAPIClient:
                 assert response.success is False
                 assert "API request failed with status 400" in response.error_message
     
+    @pytest.mark.asyncio
+    async def test_convert_text_rate_limited(self):
+        """Test throttled responses pause the API key."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key"}):
+            client = ConversionAPIClient()
+            
+            # Mock httpx client
+            mock_response = AsyncMock()
+            mock_response.status_code = 429
+            mock_response.text = "Too Many Requests"
+            mock_response.headers = {"Retry-After": "5"}
+            
+            mock_client = AsyncMock()
+            mock_client.__aenter__.return_value = mock_client
+            mock_client.__aexit__.return_value = None
+            mock_client.post.return_value = mock_response
+            
+            with patch('httpx.AsyncClient', return_value=mock_client):
+                request = ConvertTextRequest(
+                    content="# Test\n\nThis is a test.",
+                    filename="test",
+                    language="en"
+                )
+                
+                response = await client.convert_text(request)
+                
+                assert response.success is False
+                assert "API request failed with status 429" in response.error_message
+                assert client.scheduler.buckets["test-key"].time_until_available() > 4
+    
     @pytest.mark.asyncio
     async def test_get_templates_success(self):
         """Test successful template retrieval."""
@@ -141,6 +178,69 @@ class TestConversionAPIClient:
                 assert isinstance(response, TemplatesResponse)
                 assert response.templates == {}
     
+    @pytest.mark.asyncio
+    async def test_warm_up_primes_template_cache(self):
+        """Test warm-up fetches templates once and reuses them."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key"}):
+            client = ConversionAPIClient()
+            
+            # Mock httpx client
+            mock_response = AsyncMock()
+            mock_response.status_code = 200
+            mock_response.json = Mock(return_value={"en": ["thesis"]})
+            
+            mock_client = AsyncMock()
+            mock_client.get.return_value = mock_response
+            
+            with patch('httpx.AsyncClient', return_value=mock_client):
+                assert await client.warm_up() is True
+                response = await client.get_templates()
+                
+                assert response.templates["en"] == ["thesis"]
+                assert mock_client.get.call_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_convert_text_waits_for_warm_up(self):
+        """Test a conversion started during warm-up reuses its connection."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key", "MCP_SAVE_REMOTE": "true"}):
+            client = ConversionAPIClient()
+            calls = []
+            
+            async def slow_get(*args, **kwargs):
+                await asyncio.sleep(0.1)
+                calls.append("get")
+                return Mock(status_code=200, json=Mock(return_value={"en": ["thesis"]}))
+            
+            async def post(*args, **kwargs):
+                calls.append("post")
+                return Mock(status_code=200, json=Mock(return_value={"url": "https://example.com/test.docx"}))
+            
+            mock_client = Mock()
+            mock_client.get = AsyncMock(side_effect=slow_get)
+            mock_client.post = AsyncMock(side_effect=post)
+            
+            with patch('httpx.AsyncClient', return_value=mock_client):
+                warm_up = asyncio.create_task(client.warm_up())
+                await asyncio.sleep(0)
+                response = await client.convert_text(ConvertTextRequest(content="# Test"))
+                await warm_up
+            
+            assert response.success is True
+            assert calls == ["get", "post"]
+    
+    def test_http_client_keeps_connections_alive(self):
+        """Test pooled connections outlive the gap between warm-up and first call."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key"}):
+            client = ConversionAPIClient()
+            
+            with patch('httpx.AsyncClient') as mock_async_client:
+                assert client._get_http_client() is client._get_http_client()
+                
+                mock_async_client.assert_called_once()
+                limits = mock_async_client.call_args.kwargs["limits"]
+                assert limits.keepalive_expiry == KEEPALIVE_EXPIRY
+                assert limits.keepalive_expiry > 60
+    
     def test_ensure_unique_filename(self):
         """Test unique filename generation."""
         with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key"}):
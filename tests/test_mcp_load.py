@@ -0,0 +1,113 @@
+"""Smoke test for the MCP server load generator."""
+
+import asyncio
+import os
+import sys
+import tempfile
+import pytest
+from unittest.mock import patch
+from tests.mcp_load import (
+    FakeBackend,
+    StdioTransport,
+    find_listening_pid,
+    run_load,
+    server_env,
+)
+
+
+@pytest.mark.asyncio
+async def test_load_over_stdio():
+    """Test concurrent tool calls against the fake backend all succeed."""
+    with FakeBackend() as backend, tempfile.TemporaryDirectory() as home:
+        transport = StdioTransport(server_env(backend.url, home))
+        await transport.start()
+        try:
+            report = await run_load(transport, requests=20, concurrency=8, sample_interval=0.2)
+        finally:
+            await transport.close()
+    
+    assert report.errors == []
+    assert report.completed == 20
+    assert report.summary()["latency_ms"]["p99"] > 0
+
+
+@pytest.mark.asyncio
+async def test_non_json_output_fails_pending_requests():
+    """Test a corrupted stdout stream fails requests instead of hanging."""
+    transport = StdioTransport({}, timeout=5.0)
+    transport.process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", "import sys, time; sys.stdin.readline(); print('not json', flush=True); time.sleep(5)",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE
+    )
+    transport._reader = asyncio.create_task(transport._read_responses())
+    try:
+        with pytest.raises(RuntimeError, match="non-JSON output"):
+            await transport.request("ping", {})
+        assert transport._pending == {}
+    finally:
+        transport.process.kill()
+        await transport.close()
+
+
+@pytest.mark.asyncio
+async def test_request_timeout_clears_pending():
+    """Test timed-out requests are removed from the pending table."""
+    transport = StdioTransport({}, timeout=0.1)
+    transport.process = await asyncio.create_subprocess_exec(
+        sys.executable, "-c", "import time; time.sleep(5)",
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE
+    )
+    try:
+        with pytest.raises(RuntimeError, match="Timeout waiting for ping"):
+            await transport.request("ping", {})
+        assert transport._pending == {}
+    finally:
+        transport.process.kill()
+        await transport.close()
+
+
+def test_server_env_drops_operator_settings():
+    """Test load runs do not inherit rate limits or real API keys."""
+    operator_env = {
+        "DEEP_SHARE_API_KEY": "real-key",
+        "DEEP_SHARE_API_KEYS": "real-a,real-b",
+        "MD2DOC_RATE_LIMIT": "10",
+        "MD2DOC_WARMUP": "false",
+    }
+    with patch.dict(os.environ, operator_env):
+        env = server_env("http://127.0.0.1:9", "/tmp", overrides={"MD2DOC_RATE_BURST": "5"})
+    
+    assert env["DEEP_SHARE_API_KEY"] == "load-test"
+    assert "DEEP_SHARE_API_KEYS" not in env
+    assert "MD2DOC_RATE_LIMIT" not in env
+    assert env["MD2DOC_WARMUP"] == "true"
+    assert env["MD2DOC_RATE_BURST"] == "5"
+
+
+def test_find_listening_pid():
+    """Test the process behind an HTTP URL is found for RSS sampling."""
+    if not os.path.exists("/proc/net/tcp"):
+        pytest.skip("requires Linux /proc")
+    with FakeBackend() as backend:
+        assert find_listening_pid(backend.url) == os.getpid()
+
+
+def test_fake_backend_keeps_connections_alive():
+    """Test the fake backend reuses connections so pooling is measured."""
+    import http.client
+    from urllib.parse import urlsplit
+    
+    with FakeBackend() as backend:
+        parts = urlsplit(backend.url)
+        connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        try:
+            for _ in range(3):
+                connection.request("GET", "/templates")
+                response = connection.getresponse()
+                response.read()
+                assert response.version == 11
+                assert response.will_close is False
+        finally:
+            connection.close()
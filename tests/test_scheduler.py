@@ -0,0 +1,195 @@
+"""Tests for the rate limiter and fair scheduler."""
+
+import asyncio
+import os
+import pytest
+from unittest.mock import patch
+from md2doc.scheduler import FairScheduler, Priority, TokenBucket, parse_priorities
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Test cases for TokenBucket."""
+
+    def test_burst_then_refill(self):
+        """Test tokens are spent up to capacity and refilled over time."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=2.0, capacity=2, clock=clock)
+
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is False
+        assert bucket.time_until_available() == pytest.approx(0.5)
+
+        clock.now = 0.5
+        assert bucket.try_acquire() is True
+
+    def test_unlimited(self):
+        """Test a bucket without rate never runs out."""
+        bucket = TokenBucket(rate=None)
+        for _ in range(100):
+            assert bucket.try_acquire() is True
+
+    def test_burst_below_one(self):
+        """Test a bucket that can never hold a whole token is rejected."""
+        with pytest.raises(ValueError, match="Burst size must be at least 1"):
+            TokenBucket(rate=10.0, capacity=0.5)
+
+    def test_penalize(self):
+        """Test a penalized bucket is blocked for the given delay."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=None, clock=clock)
+
+        bucket.penalize(10)
+        assert bucket.try_acquire() is False
+        assert bucket.time_until_available() == pytest.approx(10)
+
+        clock.now = 10
+        assert bucket.try_acquire() is True
+
+    def test_penalize_does_not_credit_blocked_time(self):
+        """Test a limited bucket allows one request after a block, not a burst."""
+        clock = FakeClock()
+        bucket = TokenBucket(rate=1.0, capacity=5, clock=clock)
+
+        bucket.penalize(10)
+        clock.now = 10
+        assert bucket.try_acquire() is True
+        assert bucket.try_acquire() is False
+
+        clock.now = 11
+        assert bucket.try_acquire() is True
+
+
+class TestFairScheduler:
+    """Test cases for FairScheduler."""
+
+    def test_from_env_single_key(self):
+        """Test configuration from DEEP_SHARE_API_KEY."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key", "MD2DOC_RATE_LIMIT": "30"}, clear=True):
+            scheduler = FairScheduler.from_env()
+            assert list(scheduler.buckets) == ["test-key"]
+            assert scheduler.buckets["test-key"].rate == pytest.approx(0.5)
+
+    def test_from_env_multiple_keys(self):
+        """Test per-key budgets from DEEP_SHARE_API_KEYS."""
+        env = {"DEEP_SHARE_API_KEYS": "key-a:120, key-b", "MD2DOC_RATE_LIMIT": "60"}
+        with patch.dict(os.environ, env, clear=True):
+            scheduler = FairScheduler.from_env()
+            assert scheduler.buckets["key-a"].rate == pytest.approx(2.0)
+            assert scheduler.buckets["key-b"].rate == pytest.approx(1.0)
+
+    def test_from_env_without_api_key(self):
+        """Test missing API keys raise error."""
+        with patch.dict(os.environ, {}, clear=True):
+            with pytest.raises(ValueError, match="DEEP_SHARE_API_KEY environment variable is required"):
+                FairScheduler.from_env()
+
+    def test_from_env_invalid_burst(self):
+        """Test invalid MD2DOC_RATE_BURST values raise named errors."""
+        env = {"DEEP_SHARE_API_KEY": "test-key", "MD2DOC_RATE_BURST": "0.5"}
+        with patch.dict(os.environ, env, clear=True):
+            with pytest.raises(ValueError, match="MD2DOC_RATE_BURST must be at least 1"):
+                FairScheduler.from_env()
+
+        env["MD2DOC_RATE_BURST"] = "lots"
+        with patch.dict(os.environ, env, clear=True):
+            with pytest.raises(ValueError, match="MD2DOC_RATE_BURST must be a number"):
+                FairScheduler.from_env()
+
+    def test_from_env_invalid_rate(self):
+        """Test non-numeric rates raise named errors."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEYS": "key-a:fast"}, clear=True):
+            with pytest.raises(ValueError, match="DEEP_SHARE_API_KEYS must be a number"):
+                FairScheduler.from_env()
+
+    def test_from_env_rejects_non_positive_rates(self):
+        """Test zero or negative budgets raise instead of removing the limit."""
+        for env in (
+            {"DEEP_SHARE_API_KEY": "test-key", "MD2DOC_RATE_LIMIT": "-5"},
+            {"DEEP_SHARE_API_KEY": "test-key", "MD2DOC_RATE_LIMIT": "0"},
+        ):
+            with patch.dict(os.environ, env, clear=True):
+                with pytest.raises(ValueError, match="MD2DOC_RATE_LIMIT must be a positive number"):
+                    FairScheduler.from_env()
+
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEYS": "key-a:-1"}, clear=True):
+            with pytest.raises(ValueError, match="DEEP_SHARE_API_KEYS must be a positive number"):
+                FairScheduler.from_env()
+
+    def test_from_env_priorities(self):
+        """Test priority settings are parsed with the rest of the configuration."""
+        env = {
+            "DEEP_SHARE_API_KEY": "test-key",
+            "MD2DOC_CLIENT_PRIORITIES": "editor:high",
+            "MD2DOC_DEFAULT_PRIORITY": "low",
+        }
+        with patch.dict(os.environ, env, clear=True):
+            scheduler = FairScheduler.from_env()
+        assert scheduler.priority_for("editor") == Priority.HIGH
+        assert scheduler.priority_for(None) == Priority.LOW
+
+    def test_parse_priorities(self):
+        """Test parsing client priority mappings."""
+        assert parse_priorities("editor:high, ci-bot:LOW") == {
+            "editor": Priority.HIGH,
+            "ci-bot": Priority.LOW,
+        }
+        assert parse_priorities(None) == {}
+        with pytest.raises(ValueError, match="Unknown priority 'urgent'"):
+            parse_priorities("editor:urgent")
+
+    @pytest.mark.asyncio
+    async def test_round_robin_between_clients(self):
+        """Test a busy client does not starve another one."""
+        scheduler = FairScheduler({"test-key": 50.0}, burst=1)
+        await scheduler.acquire("warmup")
+
+        order = []
+
+        async def request(client_id):
+            await scheduler.acquire(client_id)
+            order.append(client_id)
+
+        await asyncio.gather(*(request(c) for c in ["a", "a", "a", "b"]))
+
+        assert order == ["a", "b", "a", "a"]
+
+    @pytest.mark.asyncio
+    async def test_priority_classes(self):
+        """Test higher priority requests are served first."""
+        scheduler = FairScheduler({"test-key": 50.0}, burst=1)
+        await scheduler.acquire("warmup")
+
+        order = []
+
+        async def request(client_id, priority):
+            await scheduler.acquire(client_id, priority)
+            order.append(priority)
+
+        await asyncio.gather(
+            request("a", Priority.LOW),
+            request("b", Priority.NORMAL),
+            request("c", Priority.HIGH),
+        )
+
+        assert order == [Priority.HIGH, Priority.NORMAL, Priority.LOW]
+
+    @pytest.mark.asyncio
+    async def test_spreads_load_across_keys(self):
+        """Test requests use the key with the most budget left."""
+        scheduler = FairScheduler({"key-a": 1.0, "key-b": 1.0}, burst=2)
+
+        keys = [await scheduler.acquire() for _ in range(4)]
+
+        assert sorted(keys) == ["key-a", "key-a", "key-b", "key-b"]
+        assert scheduler.pending == 0
@@ -0,0 +1,214 @@
+"""Tests for the MCP server."""
+
+import asyncio
+import os
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from md2doc import server
+from md2doc.scheduler import Priority
+
+
+class TestClientIdentity:
+    """Test cases for fair-share client identification."""
+    
+    def test_ignores_request_meta_client_id(self):
+        """Test callers cannot pick their own queue with _meta.client_id."""
+        session = object()
+        first = Mock(client_id="spoofed-1", session=session)
+        second = Mock(client_id="spoofed-2", session=session)
+        
+        assert server.get_client_id(first) == server.get_client_id(second)
+        assert "spoofed" not in server.get_client_id(first)
+    
+    def test_sessions_are_separate_clients(self):
+        """Test different sessions get different queues."""
+        first = Mock(session=object())
+        second = Mock(session=object())
+        
+        assert server.get_client_id(first) != server.get_client_id(second)
+    
+    def test_uses_authenticated_client_id(self):
+        """Test the OAuth client ID is preferred over the session."""
+        with patch.object(server, "get_access_token", return_value=Mock(client_id="editor")):
+            assert server.get_client_id(Mock(session=object())) == "client:editor"
+    
+    def test_without_context(self):
+        """Test calls outside a request share the default queue."""
+        assert server.get_client_id(None) == "default"
+
+
+class TestPriority:
+    """Test cases for server-side priority classes."""
+    
+    def make_api_client(self, **env):
+        """Create an API client with priority settings from the environment."""
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key", **env}, clear=True):
+            return server.ConversionAPIClient()
+    
+    def test_default_priority(self):
+        """Test requests are normal priority by default."""
+        assert server.get_priority(self.make_api_client()) == Priority.NORMAL
+        api_client = self.make_api_client(MD2DOC_DEFAULT_PRIORITY="low")
+        assert server.get_priority(api_client) == Priority.LOW
+    
+    def test_client_priorities(self):
+        """Test authenticated clients get their configured priority."""
+        api_client = self.make_api_client(MD2DOC_CLIENT_PRIORITIES="editor:high,ci-bot:low")
+        with patch.object(server, "get_access_token", return_value=Mock(client_id="editor")):
+            assert server.get_priority(api_client) == Priority.HIGH
+        with patch.object(server, "get_access_token", return_value=Mock(client_id="other")):
+            assert server.get_priority(api_client) == Priority.NORMAL
+        # Unauthenticated callers cannot claim a configured client's priority
+        assert server.get_priority(api_client) == Priority.NORMAL
+    
+    def test_invalid_priorities_fail_at_startup(self):
+        """Test priority typos are reported when the API client is created."""
+        with pytest.raises(ValueError, match="Unknown priority 'urgent'"):
+            self.make_api_client(MD2DOC_CLIENT_PRIORITIES="editor:urgent")
+        with pytest.raises(ValueError, match="Unknown priority 'hihg'"):
+            self.make_api_client(MD2DOC_DEFAULT_PRIORITY="hihg")
+    
+    @pytest.mark.asyncio
+    async def test_tool_call_uses_priority(self):
+        """Test the conversion tool queues requests with the mapped priority."""
+        api_client = self.make_api_client(MD2DOC_CLIENT_PRIORITIES="ci-bot:low")
+        
+        with patch.object(server, "get_access_token", return_value=Mock(client_id="ci-bot")):
+            with patch.object(server, "get_api_client", return_value=api_client):
+                with patch.object(api_client, "convert_text", AsyncMock(side_effect=Exception("stop"))):
+                    await server.convert_markdown_to_docx("# Test")
+                    
+                    _, kwargs = api_client.convert_text.call_args
+        
+        assert kwargs["client_id"] == "client:ci-bot"
+        assert kwargs["priority"] == Priority.LOW
+
+
+class TestToolSchema:
+    """Test cases for the tool schemas exposed to MCP clients."""
+    
+    @pytest.mark.asyncio
+    async def test_context_is_not_a_tool_argument(self):
+        """Test the injected context is hidden from callers."""
+        tools = {tool.name: tool for tool in await server.mcp.list_tools()}
+        
+        schema = tools["convert_markdown_to_docx"].inputSchema
+        assert "ctx" not in schema["properties"]
+        assert schema["required"] == ["content"]
+
+
+@pytest.fixture
+def fresh_server():
+    """Reset the lazily created API client and warm-up task."""
+    with patch.object(server, "_api_client", None), patch.object(server, "_warm_up_task", None):
+        yield server
+
+
+class TestWarmUp:
+    """Test cases for the startup warm-up and shutdown."""
+    
+    @pytest.mark.asyncio
+    async def test_lifespan_starts_warm_up(self, fresh_server):
+        """Test the lifespan warms up the API client in the background."""
+        api_client = Mock()
+        api_client.warm_up = AsyncMock(return_value=True)
+        
+        with patch.dict(os.environ, {}, clear=True):
+            with patch.object(server, "get_api_client", return_value=api_client):
+                async with server.lifespan(server.mcp):
+                    await server._warm_up_task
+        
+        api_client.warm_up.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_runs_once(self, fresh_server):
+        """Test repeated lifespans, e.g. HTTP sessions, share one warm-up."""
+        api_client = Mock()
+        api_client.warm_up = AsyncMock(return_value=True)
+        
+        with patch.object(server, "get_api_client", return_value=api_client):
+            first = server.start_warm_up()
+            second = server.start_warm_up()
+            await first
+        
+        assert first is second
+        api_client.warm_up.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_disabled(self, fresh_server):
+        """Test MD2DOC_WARMUP=false skips the warm-up."""
+        with patch.dict(os.environ, {"MD2DOC_WARMUP": "false"}, clear=True):
+            with patch.object(server, "start_warm_up") as start_warm_up:
+                async with server.lifespan(server.mcp):
+                    pass
+        
+        start_warm_up.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_without_api_key(self, fresh_server):
+        """Test a missing API key skips the warm-up instead of failing startup."""
+        with patch.dict(os.environ, {}, clear=True):
+            assert server.start_warm_up() is None
+        
+        assert server._warm_up_task is None
+    
+    @pytest.mark.asyncio
+    async def test_warm_up_failure_is_logged(self, fresh_server):
+        """Test warm-up errors do not escape the background task."""
+        api_client = Mock()
+        api_client.warm_up = AsyncMock(side_effect=RuntimeError("boom"))
+        
+        with patch.object(server, "get_api_client", return_value=api_client):
+            await server.start_warm_up()
+    
+    @pytest.mark.asyncio
+    async def test_shutdown_cancels_warm_up_and_closes_client(self, fresh_server):
+        """Test shutdown cancels a pending warm-up and closes connections."""
+        async def slow_warm_up():
+            await asyncio.sleep(10)
+        
+        api_client = Mock()
+        api_client.warm_up = slow_warm_up
+        api_client.aclose = AsyncMock()
+        
+        with patch.object(server, "get_api_client", return_value=api_client):
+            task = server.start_warm_up()
+            server._api_client = api_client
+            await asyncio.sleep(0)
+            await server.shutdown()
+        
+        assert task.cancelled()
+        assert server._warm_up_task is None
+        api_client.aclose.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_serve_shuts_down_after_transport_stops(self, fresh_server):
+        """Test serve() cleans up once the transport returns."""
+        with patch.object(server.mcp, "run_stdio_async", AsyncMock()) as run_stdio:
+            with patch.object(server, "shutdown", AsyncMock()) as shutdown:
+                await server.serve()
+        
+        run_stdio.assert_awaited_once()
+        shutdown.assert_awaited_once()
+    
+    @pytest.mark.asyncio
+    async def test_list_templates_during_warm_up(self, fresh_server):
+        """Test a tool call right after launch shares the warm-up request."""
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.1)
+            response = Mock(status_code=200)
+            response.json = Mock(return_value={"en": ["thesis"]})
+            return response
+        
+        http_client = Mock()
+        http_client.get = AsyncMock(side_effect=slow_get)
+        
+        with patch.dict(os.environ, {"DEEP_SHARE_API_KEY": "test-key"}, clear=True):
+            with patch("httpx.AsyncClient", return_value=http_client):
+                warm_up = server.start_warm_up()
+                await asyncio.sleep(0)
+                result = await server.list_templates()
+                await warm_up
+        
+        assert "thesis" in result
+        http_client.get.assert_awaited_once()